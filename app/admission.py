@@ -0,0 +1,129 @@
+import functools
+import threading
+import time
+from typing import Callable, Optional
+from flask import jsonify
+from .config import (
+    ADMISSION_MAX_CONCURRENT,
+    ADMISSION_MAX_QUEUE,
+    ADMISSION_QUEUE_TIMEOUT_SECONDS,
+    WEB_THREADS,
+)
+
+_local = threading.local()
+
+
+class DeadlineExceeded(Exception):
+    """تجاوز المهلة المحددة للطلب الحالي"""
+    pass
+
+
+def current_deadline() -> Optional[float]:
+    return getattr(_local, "deadline", None)
+
+
+def remaining_timeout(default: float) -> float:
+    """
+    المهلة المتاحة لطلب خارجي: القيمة الافتراضية أو ما تبقى من مهلة الطلب الحالي
+    أيهما أقل. خارج طلب محدود (مثل الخيوط الخلفية) تُرجع القيمة الافتراضية.
+
+    المهلة هنا تقريبية: requests يطبقها على كل اتصال وكل قراءة من المقبس لا على الطلب
+    كاملاً، فقد تتجاوز استجابة بطيئة التدفق المهلة؛ لذلك يستدعي مسار النشر
+    check_deadline() بعد كل طلب خارجي.
+    """
+    deadline = current_deadline()
+    if deadline is None:
+        return default
+    remaining = deadline - time.monotonic()
+    if remaining <= 0:
+        raise DeadlineExceeded("Request deadline exceeded")
+    return min(default, remaining)
+
+
+def check_deadline() -> None:
+    """رفع DeadlineExceeded إذا انتهت مهلة الطلب الحالي"""
+    remaining_timeout(0)
+
+
+class AdmissionGate:
+    """
+    بوابة تحدّ من عدد الطلبات الثقيلة المتزامنة مع طابور انتظار محدود،
+    وترفض الطلبات فوراً (429/503) عند التشبع حتى تبقى /health سريعة.
+    """
+
+    def __init__(
+        self,
+        max_concurrent: int = ADMISSION_MAX_CONCURRENT,
+        max_queue: int = ADMISSION_MAX_QUEUE,
+        queue_timeout_seconds: float = ADMISSION_QUEUE_TIMEOUT_SECONDS,
+        web_threads: int = WEB_THREADS,
+    ):
+        # كل طلب نشط أو منتظر يحجز خيطاً من gunicorn: نترك خيطاً واحداً على الأقل
+        # لا تصل إليه المسارات المحدودة حتى تبقى /health سريعة
+        available = max(web_threads - 1, 1)
+        self.max_concurrent = max(1, min(max_concurrent, available))
+        self.max_queue = max(0, min(max_queue, available - self.max_concurrent))
+        self.queue_timeout_seconds = queue_timeout_seconds
+        self._slots = threading.BoundedSemaphore(self.max_concurrent)
+        self._lock = threading.Lock()
+        self._waiting = 0
+        self.rejected = 0
+        self.timed_out = 0
+
+    def _acquire(self, max_wait: float) -> Optional[int]:
+        """حجز مكان للطلب. يرجع None عند النجاح أو رمز حالة HTTP عند الرفض."""
+        if self._slots.acquire(blocking=False):
+            return None
+
+        with self._lock:
+            if self._waiting >= self.max_queue:
+                self.rejected += 1
+                return 429
+            self._waiting += 1
+        try:
+            acquired = self._slots.acquire(timeout=min(self.queue_timeout_seconds, max_wait))
+        finally:
+            with self._lock:
+                self._waiting -= 1
+
+        if not acquired:
+            with self._lock:
+                self.timed_out += 1
+            return 503
+        return None
+
+    def limit(self, deadline_seconds: float) -> Callable:
+        """مزخرف لمسارات Flask: حد التزامن ومهلة إجمالية تنتقل إلى الطلبات الخارجية"""
+        def decorator(func: Callable) -> Callable:
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                started = time.monotonic()
+                status = self._acquire(deadline_seconds)
+                if status is not None:
+                    message = "Too many requests" if status == 429 else "Service busy"
+                    resp = jsonify({"status": "error", "message": message})
+                    resp.headers["Retry-After"] = str(int(self.queue_timeout_seconds) or 1)
+                    return resp, status
+
+                # المهلة تُحسب من لحظة وصول الطلب، بما فيها وقت الانتظار في الطابور
+                _local.deadline = started + deadline_seconds
+                try:
+                    return func(*args, **kwargs)
+                except DeadlineExceeded as e:
+                    print(f"⏱️ تجاوز مهلة الطلب: {e}")
+                    return jsonify({"status": "error", "message": "Deadline exceeded"}), 503
+                finally:
+                    _local.deadline = None
+                    self._slots.release()
+            return wrapper
+        return decorator
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "max_concurrent": self.max_concurrent,
+                "max_queue": self.max_queue,
+                "waiting": self._waiting,
+                "rejected": self.rejected,
+                "timed_out": self.timed_out,
+            }
@@ -1,20 +1,90 @@
 import hashlib
 import hmac
+import threading
 import time
+from collections import OrderedDict
 import requests
 import json
-from typing import Dict, Any, List, Optional
+from typing import Callable, Dict, Any, List, Optional, Tuple
+from .tracing import span
+from .credential_pool import CredentialPool, parse_credentials
+from .admission import DeadlineExceeded, remaining_timeout
 
 class AliExpressApiClient:
-    def __init__(self, app_key: str = None, app_secret: str = None, tracking_id: str = None):
-        from .config import AE_APP_KEY, AE_APP_SECRET, ALI_TRACKING_ID
+    def __init__(self, app_key: str = None, app_secret: str = None, tracking_id: str = None,
+                 credential_pool: Optional[CredentialPool] = None):
+        from .config import AE_APP_KEY, AE_APP_SECRET, ALI_TRACKING_ID, AE_CREDENTIALS
         
         self.app_key = app_key or AE_APP_KEY
         self.app_secret = app_secret or AE_APP_SECRET
         self.tracking_id = tracking_id or ALI_TRACKING_ID
+
+        if credential_pool is None:
+            credentials = [{
+                "app_key": self.app_key,
+                "app_secret": self.app_secret,
+                "tracking_id": self.tracking_id,
+            }]
+            # المفاتيح الإضافية تُستخدم فقط مع الإعدادات الافتراضية
+            if not (app_key or app_secret or tracking_id):
+                extra = parse_credentials(AE_CREDENTIALS)
+                credentials += [c for c in extra if c["app_key"] != self.app_key]
+            credential_pool = CredentialPool(credentials)
+        self.credential_pool = credential_pool
         self.base_url = "https://api-sg.aliexpress.com/sync"
+        # يُستدعى مع اسم الطريقة عند كل طلب API (لحساب تكلفة النشر)
+        self.on_request: Optional[Callable[[str], None]] = None
+        # رابط المنتج -> (وقت الإنشاء، الرابط المختصر)، بترتيب الإضافة (الأقدم أولاً)
+        self._link_cache: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        self._link_cache_lock = threading.Lock()
+
+    def _get_cached_link(self, product_url: str) -> Optional[str]:
+        from .config import AFFILIATE_LINK_CACHE_TTL_SECONDS
+
+        with self._link_cache_lock:
+            entry = self._link_cache.get(product_url)
+            if entry is None:
+                return None
+            if time.time() - entry[0] > AFFILIATE_LINK_CACHE_TTL_SECONDS:
+                self._link_cache.pop(product_url, None)
+                return None
+            return entry[1]
+
+    def _store_link(self, product_url: str, short_link: str, created_at: Optional[float] = None) -> None:
+        """حفظ رابط مختصر مع حذف المنتهي الصلاحية والأقدم عند تجاوز الحد الأقصى"""
+        from .config import AFFILIATE_LINK_CACHE_TTL_SECONDS, AFFILIATE_LINK_CACHE_MAX
+
+        now = time.time()
+        created_at = now if created_at is None else created_at
+        if now - created_at > AFFILIATE_LINK_CACHE_TTL_SECONDS:
+            return
+        with self._link_cache_lock:
+            self._link_cache[product_url] = (created_at, short_link)
+            self._link_cache.move_to_end(product_url)
+            while self._link_cache:
+                oldest_url, (oldest_ts, _) = next(iter(self._link_cache.items()))
+                if (len(self._link_cache) <= AFFILIATE_LINK_CACHE_MAX
+                        and now - oldest_ts <= AFFILIATE_LINK_CACHE_TTL_SECONDS):
+                    break
+                self._link_cache.pop(oldest_url)
+
+    def export_link_cache(self) -> Dict[str, Tuple[float, str]]:
+        """نسخة من الروابط المختصرة الصالحة لحفظها في لقطة الحالة"""
+        from .config import AFFILIATE_LINK_CACHE_TTL_SECONDS
 
-    def _sign(self, params: Dict[str, Any]) -> str:
+        now = time.time()
+        with self._link_cache_lock:
+            return {
+                url: entry for url, entry in self._link_cache.items()
+                if now - entry[0] <= AFFILIATE_LINK_CACHE_TTL_SECONDS
+            }
+
+    def import_link_cache(self, entries: Dict[str, Any]) -> None:
+        for url, (created_at, short_link) in sorted(entries.items(), key=lambda e: e[1][0]):
+            if url not in self._link_cache:
+                self._store_link(url, short_link, float(created_at))
+
+    def _sign(self, params: Dict[str, Any], app_secret: Optional[str] = None) -> str:
         """توقيع الطلبات لـ AliExpress API"""
         sorted_params = sorted([
             (k, str(v)) for k, v in params.items() 
@@ -24,7 +94,7 @@ class AliExpressApiClient:
         concatenated = ''.join(f"{k}{v}" for k, v in sorted_params)
         
         signature = hmac.new(
-            self.app_secret.encode('utf-8'),
+            (app_secret or self.app_secret).encode('utf-8'),
             concatenated.encode('utf-8'),
             hashlib.sha256
         ).hexdigest().upper()
@@ -33,26 +103,56 @@ class AliExpressApiClient:
 
     def _request(self, method: str, api_params: Dict[str, Any]) -> Dict[str, Any]:
         """إرسال طلب إلى AliExpress API"""
+        from .config import REQUEST_TIMEOUT
+
+        # يرفع DeadlineExceeded قبل حجز حصة مفتاح إذا انتهت مهلة الطلب الحالي
+        timeout = remaining_timeout(REQUEST_TIMEOUT)
         timestamp = str(int(time.time() * 1000))
+        cred = self.credential_pool.acquire()
         
         params = {
             "method": method,
-            "app_key": self.app_key,
+            "app_key": cred.app_key,
             "timestamp": timestamp,
             "sign_method": "sha256",
             **api_params
         }
+        # معرّف التتبع يجب أن يتبع المفتاح المستخدم في الطلب
+        if "tracking_id" in params:
+            params["tracking_id"] = cred.tracking_id
         
         # إضافة التوقيع
-        params["sign"] = self._sign(params)
+        params["sign"] = self._sign(params, cred.app_secret)
         
         print(f"🔧 إرسال طلب {method} إلى AliExpress API...")
-        response = requests.get(self.base_url, params=params, timeout=30)
-        response.raise_for_status()
-        
-        data = response.json()
+        if self.on_request is not None:
+            self.on_request(method)
+        response = None
+        with span("ali.request", method=method, app_key=cred.masked_key()):
+            try:
+                response = requests.get(self.base_url, params=params, timeout=timeout)
+                if response.status_code == 429:
+                    self.credential_pool.report_error(cred, rate_limited=True)
+                response.raise_for_status()
+                
+                data = response.json()
+            except Exception:
+                if response is None or response.status_code != 429:
+                    self.credential_pool.report_error(cred)
+                raise
+
+        error = data.get("error_response") if isinstance(data, dict) else None
+        if error:
+            self.credential_pool.report_error(cred, rate_limited=self._is_rate_limit_error(error))
+        else:
+            self.credential_pool.report_success(cred)
         return data
 
+    def _is_rate_limit_error(self, error: Dict[str, Any]) -> bool:
+        """أخطاء تجاوز حد الطلبات (مثل ApiCallLimit) تستدعي إيقاف المفتاح مؤقتاً"""
+        code = f"{error.get('code', '')} {error.get('sub_code', '')}".lower()
+        return "limit" in code or "frequency" in code
+
     def search_products(self, category_info: Dict[str, Any], limit: int = 20, 
                        min_price: Optional[float] = None, max_price: Optional[float] = None) -> List[Dict[str, Any]]:
         """بحث عن المنتجات - الدالة المفقودة!"""
@@ -68,10 +168,11 @@ class AliExpressApiClient:
             
             if category_id:
                 api_params["category_id"] = category_id
+            # aliexpress.affiliate.product.query يقبل min_sale_price/max_sale_price بالسنت
             if min_price is not None:
-                api_params["min_price"] = min_price
+                api_params["min_sale_price"] = int(round(min_price * 100))
             if max_price is not None:
-                api_params["max_price"] = max_price
+                api_params["max_sale_price"] = int(round(max_price * 100))
 
             method_name = "aliexpress.affiliate.product.query"
             raw = self._request(method_name, api_params)
@@ -80,16 +181,49 @@ class AliExpressApiClient:
             print(f"✅ تم العثور على {len(items)} منتج للفئة {category_info.get('name')}")
             return items
             
+        except DeadlineExceeded:
+            raise
         except Exception as e:
             print(f"❌ خطأ في البحث عن المنتجات: {e}")
             return []
 
-    def _extract_products_from_response(self, raw: Dict[str, Any]) -> List[Dict[str, Any]]:
+    def get_product_details(self, product_ids: List[str]) -> Optional[Dict[str, Dict[str, Any]]]:
+        """
+        جلب التفاصيل الحالية لمجموعة منتجات (السعر، الرابط، الصورة).
+        يرجع قاموساً {product_id: product} للمنتجات التي ما زالت متاحة،
+        أو None عند فشل الطلب حتى لا يُعتبر الفشل دليلاً على حذف المنتجات.
+        """
+        if not product_ids:
+            return {}
+        try:
+            api_params = {
+                "product_ids": ",".join(str(pid) for pid in product_ids),
+                "tracking_id": self.tracking_id,
+            }
+
+            method_name = "aliexpress.affiliate.productdetail.get"
+            raw = self._request(method_name, api_params)
+
+            items = self._extract_products_from_response(
+                raw, response_key="aliexpress_affiliate_productdetail_get_response"
+            )
+            return {str(item["id"]): item for item in items}
+
+        except DeadlineExceeded:
+            raise
+        except Exception as e:
+            print(f"❌ خطأ في جلب تفاصيل المنتجات: {e}")
+            return None
+
+    def _extract_products_from_response(
+        self, raw: Dict[str, Any],
+        response_key: str = "aliexpress_affiliate_product_query_response",
+    ) -> List[Dict[str, Any]]:
         """استخراج المنتجات من استجابة API"""
         products = []
         
         try:
-            resp = raw.get("aliexpress_affiliate_product_query_response", {})
+            resp = raw.get(response_key, {})
             resp_result = resp.get("resp_result", {})
             result = resp_result.get("result", {})
             products_node = result.get("products", {})
@@ -143,8 +277,14 @@ class AliExpressApiClient:
                     continue
         return 0.0
 
-    def generate_affiliate_link(self, product_url: str) -> str:
-        """إنشاء رابط تابع مختصر"""
+    def generate_affiliate_link(self, product_url: str, use_cache: bool = True) -> str:
+        """إنشاء رابط تابع مختصر (use_cache=False لتجاوز التخزين واختبار API مباشرة)"""
+        if use_cache:
+            cached = self._get_cached_link(product_url)
+            if cached:
+                print(f"♻️ استخدام رابط مختصر مخزن: {cached}")
+                return cached
+
         try:
             api_params = {
                 "urls": product_url,
@@ -169,11 +309,15 @@ class AliExpressApiClient:
                 short_link = promotion_links[0].get("promotion_url") or promotion_links[0].get("promotion_link")
                 if short_link and short_link != product_url:
                     print(f"✅ تم إنشاء رابط مختصر: {short_link}")
+                    if use_cache:
+                        self._store_link(product_url, short_link)
                     return short_link
             
             print("❌ لم يتم إنشاء رابط مختصر")
             return product_url
             
+        except DeadlineExceeded:
+            raise
         except Exception as e:
             print(f"❌ خطأ في إنشاء الرابط التابع: {e}")
             return product_url
@@ -59,6 +59,11 @@ except ConfigError as e:
     print(f"❌ خطأ في إعدادات AliExpress API: {e}")
     sys.exit(1)
 
+# مفاتيح إضافية لتوزيع الطلبات (اختياري): key1:secret1:tracking1,key2:secret2:tracking2
+AE_CREDENTIALS = get_optional_env("AE_CREDENTIALS", "")
+ALI_KEY_DAILY_QUOTA = int(get_optional_env("ALI_KEY_DAILY_QUOTA", "5000"))
+ALI_KEY_COOLDOWN_SECONDS = int(get_optional_env("ALI_KEY_COOLDOWN_SECONDS", "60"))
+
 # AliExpress API Endpoints
 ALI_API_BASE = "https://api-sg.aliexpress.com/sync"
 ALI_OAUTH_BASE = "https://api-sg.aliexpress.com/rest"
@@ -67,7 +72,12 @@ ALI_OAUTH_BASE = "https://api-sg.aliexpress.com/rest"
 DATA_DIR = BASE_DIR / "data"
 COUPONS_FILE = DATA_DIR / "coupons.json"
 SENT_PRODUCTS_FILE = DATA_DIR / "sent_products.json"
+PUBLISH_STATS_FILE = DATA_DIR / "publish_stats.json"
 LOG_FILE = DATA_DIR / "app.log"
+TRACES_DIR = DATA_DIR / "traces"
+# ملاحظة: القرص المحلي في خطة Render المجانية لا يبقى بعد إيقاف الخدمة، لذا يجب توجيه
+# WARM_STATE_FILE إلى تخزين دائم (مثل قرص Render مثبت) حتى تنجو اللقطة من التشغيل البارد
+WARM_STATE_FILE = Path(get_optional_env("WARM_STATE_FILE", str(DATA_DIR / "warm_state.json.gz")))
 
 # إنشاء المجلدات إذا لم تكن موجودة
 DATA_DIR.mkdir(exist_ok=True)
@@ -112,12 +122,58 @@ PRODUCT_CATEGORIES: List[Dict[str, Any]] = [
 ALI_PRODUCTS_FETCH_LIMIT = int(get_optional_env("ALI_PRODUCTS_FETCH_LIMIT", "20"))
 MAX_PRODUCT_PRICE = float(get_optional_env("MAX_PRODUCT_PRICE", "500"))
 MIN_PRODUCT_PRICE = float(get_optional_env("MIN_PRODUCT_PRICE", "30"))
+# مدة صلاحية نتائج البحث المخزنة لكل شريحة سعرية (بالثواني)
+PRODUCT_CACHE_TTL_SECONDS = int(get_optional_env("PRODUCT_CACHE_TTL_SECONDS", "1800"))
+# الشرائح السعرية الأضيق من هذا العرض (بعد القص على حدود السعر) لا يُبحث فيها
+MIN_PRICE_BAND_WIDTH = float(get_optional_env("MIN_PRICE_BAND_WIDTH", "10"))
+
+# إعادة التحقق الدورية من المنتجات المخزنة في الخلفية
+REVALIDATION_ENABLED = get_optional_env("REVALIDATION_ENABLED", "True").lower() == "true"
+REVALIDATION_INTERVAL_SECONDS = int(get_optional_env("REVALIDATION_INTERVAL_SECONDS", "300"))
+REVALIDATION_BATCH_SIZE = int(get_optional_env("REVALIDATION_BATCH_SIZE", "20"))
+# لا يُعاد التحقق من منتج إلا إذا مر على آخر تحقق (أو جلب) هذا العمر
+REVALIDATION_MIN_AGE_SECONDS = int(get_optional_env("REVALIDATION_MIN_AGE_SECONDS", "1200"))
+# حد أقصى لطلبات التفاصيل في كل دورة حتى لا تستهلك حصة API المخصصة للنشر
+REVALIDATION_MAX_BATCHES_PER_CYCLE = int(get_optional_env("REVALIDATION_MAX_BATCHES_PER_CYCLE", "5"))
+
+# مدة صلاحية الروابط المختصرة المخزنة (بالثواني)
+AFFILIATE_LINK_CACHE_TTL_SECONDS = int(get_optional_env("AFFILIATE_LINK_CACHE_TTL_SECONDS", "86400"))
+# الحد الأقصى لعدد الروابط المختصرة المخزنة في الذاكرة (يُحذف الأقدم أولاً)
+AFFILIATE_LINK_CACHE_MAX = int(get_optional_env("AFFILIATE_LINK_CACHE_MAX", "500"))
+
+# لقطات الحالة الدافئة لتسريع أول طلب بعد إيقاف الخدمة (خطة Render المجانية)
+WARM_STATE_ENABLED = get_optional_env("WARM_STATE_ENABLED", "True").lower() == "true"
+WARM_STATE_SNAPSHOT_INTERVAL_SECONDS = int(get_optional_env("WARM_STATE_SNAPSHOT_INTERVAL_SECONDS", "600"))
 
 # Application Settings
 DEBUG = get_optional_env("DEBUG", "False").lower() == "true"
 LOG_LEVEL = get_optional_env("LOG_LEVEL", "INFO")
 REQUEST_TIMEOUT = int(get_optional_env("REQUEST_TIMEOUT", "30"))
 
+# Admission Control
+# عدد خيوط gunicorn لكل عامل (يستخدمه render.yaml أيضاً عبر --threads $WEB_THREADS)
+WEB_THREADS = int(get_optional_env("WEB_THREADS", "4"))
+# عدد الطلبات الثقيلة (/publish و /test-shorten) المسموح بها بالتوازي، وحجم طابور الانتظار.
+# كل طلب منتظر يحجز خيطاً، لذا يُقص الطابور حتى يبقى خيط واحد على الأقل لـ /health
+ADMISSION_MAX_CONCURRENT = int(get_optional_env("ADMISSION_MAX_CONCURRENT", "2"))
+ADMISSION_MAX_QUEUE = int(get_optional_env(
+    "ADMISSION_MAX_QUEUE", str(max(WEB_THREADS - ADMISSION_MAX_CONCURRENT - 1, 0))
+))
+ADMISSION_QUEUE_TIMEOUT_SECONDS = float(get_optional_env("ADMISSION_QUEUE_TIMEOUT_SECONDS", "5"))
+# المهلة الإجمالية لكل مسار، وتُقتطع منها مهلات طلبات AliExpress وتيليجرام
+PUBLISH_DEADLINE_SECONDS = float(get_optional_env("PUBLISH_DEADLINE_SECONDS", "25"))
+TEST_SHORTEN_DEADLINE_SECONDS = float(get_optional_env("TEST_SHORTEN_DEADLINE_SECONDS", "10"))
+
+# Profiling & Tracing
+# تفعيل cProfile لكل طلب
+PROFILE_REQUESTS = get_optional_env("PROFILE_REQUESTS", "False").lower() == "true"
+# تفعيل التحليل لطلب واحد عبر الترويسة X-Profile: <السر>، معطل إذا كان السر فارغاً
+PROFILE_HEADER_SECRET = get_optional_env("PROFILE_HEADER_SECRET", "")
+# الحد الأقصى لعدد ملفات التتبع المحفوظة، ويُحذف الأقدم عند تجاوزه
+TRACES_MAX_FILES = int(get_optional_env("TRACES_MAX_FILES", "50"))
+# الطلبات الأبطأ من هذا الحد تُحفظ كملفات تتبع في data/traces
+SLOW_REQUEST_THRESHOLD_SECONDS = float(get_optional_env("SLOW_REQUEST_THRESHOLD_SECONDS", "10"))
+
 # Price Settings for Coupons
 PRICE_RANGES = {
     "low": (30, 50),
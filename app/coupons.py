@@ -2,6 +2,7 @@ import json
 import random
 from typing import Optional, Dict, Any, List, Tuple
 from .config import COUPONS_FILE
+from .tracing import traced
 
 
 class CouponManager:
@@ -31,6 +32,30 @@ class CouponManager:
                 return r
         return None
 
+    def get_price_bands(
+        self, min_price: Optional[float] = None, max_price: Optional[float] = None
+    ) -> List[Tuple[float, float]]:
+        """
+        إرجاع الشرائح السعرية التي تحتوي على كوبونات، مرتبة تصاعدياً.
+        يتم قص كل شريحة على الحدود [min_price, max_price] إن وُجدت،
+        وتُستبعد الشرائح التي تقع خارجها بالكامل.
+        """
+        bands: List[Tuple[float, float]] = []
+        for r in self._ranges:
+            low = r.get("min_price")
+            high = r.get("max_price")
+            if low is None or high is None or not r.get("coupons"):
+                continue
+            low, high = float(low), float(high)
+            if min_price is not None:
+                low = max(low, float(min_price))
+            if max_price is not None:
+                high = min(high, float(max_price))
+            if low <= high:
+                bands.append((low, high))
+        return sorted(bands)
+
+    @traced("coupons.get_random_coupon_for_price")
     def get_random_coupon_for_price(
         self, price: float
     ) -> Tuple[Optional[Dict[str, Any]], Optional[float]]:
@@ -0,0 +1,188 @@
+import hashlib
+import threading
+import time
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional
+from .config import ALI_KEY_DAILY_QUOTA, ALI_KEY_COOLDOWN_SECONDS
+
+QUOTA_WINDOW_SECONDS = 24 * 60 * 60
+ERROR_WINDOW_SIZE = 50
+
+
+class ApiCredential:
+    """مجموعة بيانات اعتماد واحدة لـ AliExpress مع عدادات الاستخدام الخاصة بها"""
+
+    def __init__(self, app_key: str, app_secret: str, tracking_id: str, daily_quota: int):
+        self.app_key = app_key
+        self.app_secret = app_secret
+        self.tracking_id = tracking_id
+        self.daily_quota = daily_quota
+        self.window_start = time.time()
+        self.calls_in_window = 0
+        self.total_calls = 0
+        self.total_errors = 0
+        self.rate_limited = 0
+        self.cooldown_until = 0.0
+        self._recent: Deque[bool] = deque(maxlen=ERROR_WINDOW_SIZE)
+
+    def _roll_window(self, now: float) -> None:
+        if now - self.window_start >= QUOTA_WINDOW_SECONDS:
+            self.window_start = now
+            self.calls_in_window = 0
+
+    def remaining_quota(self, now: float) -> int:
+        self._roll_window(now)
+        return max(self.daily_quota - self.calls_in_window, 0)
+
+    def error_rate(self) -> float:
+        if not self._recent:
+            return 0.0
+        return sum(1 for ok in self._recent if not ok) / len(self._recent)
+
+    def score(self, now: float) -> float:
+        """كلما زادت الحصة المتبقية وقلّ معدل الأخطاء ارتفعت الأولوية"""
+        quota_ratio = self.remaining_quota(now) / self.daily_quota if self.daily_quota else 0.0
+        return quota_ratio * (1.0 - self.error_rate())
+
+    def masked_key(self) -> str:
+        return _mask(self.app_key)
+
+    def masked_tracking_id(self) -> str:
+        return _mask(self.tracking_id)
+
+    def fingerprint(self) -> str:
+        """معرّف ثابت للمفتاح يُحفظ في اللقطات بدل المفتاح نفسه"""
+        return hashlib.sha256(self.app_key.encode("utf-8")).hexdigest()[:16]
+
+
+def _mask(value: str) -> str:
+    return f"{value[:4]}***" if value else ""
+
+
+class CredentialPool:
+    """
+    توزيع الطلبات على عدة مفاتيح AliExpress حسب الحصة المتبقية ومعدل الأخطاء،
+    مع إيقاف مؤقت للمفاتيح التي تتجاوز حد الطلبات.
+    """
+
+    def __init__(
+        self,
+        credentials: List[Dict[str, str]],
+        daily_quota: int = ALI_KEY_DAILY_QUOTA,
+        cooldown_seconds: int = ALI_KEY_COOLDOWN_SECONDS,
+    ):
+        if not credentials:
+            raise ValueError("At least one AliExpress credential is required")
+        self.cooldown_seconds = cooldown_seconds
+        self._credentials = [
+            ApiCredential(c["app_key"], c["app_secret"], c["tracking_id"], daily_quota)
+            for c in credentials
+        ]
+        self._lock = threading.Lock()
+        # هل استُعيدت العدادات من لقطة سابقة؟ بدونها تبدأ الحصص من الصفر بعد كل تشغيل
+        self.restored = False
+
+    @property
+    def primary(self) -> ApiCredential:
+        return self._credentials[0]
+
+    def acquire(self) -> ApiCredential:
+        """اختيار أفضل مفتاح متاح وحجز طلب واحد من حصته"""
+        with self._lock:
+            now = time.time()
+            available = [c for c in self._credentials if c.cooldown_until <= now]
+            if available:
+                cred = max(available, key=lambda c: c.score(now))
+            else:
+                # كل المفاتيح في فترة التبريد: نستخدم أقربها للانتهاء بدل الفشل
+                cred = min(self._credentials, key=lambda c: c.cooldown_until)
+            cred.remaining_quota(now)
+            cred.calls_in_window += 1
+            cred.total_calls += 1
+            return cred
+
+    def report_success(self, cred: ApiCredential) -> None:
+        with self._lock:
+            cred._recent.append(True)
+
+    def report_error(self, cred: ApiCredential, rate_limited: bool = False) -> None:
+        with self._lock:
+            cred._recent.append(False)
+            cred.total_errors += 1
+            if rate_limited:
+                cred.rate_limited += 1
+                cred.cooldown_until = time.time() + self.cooldown_seconds
+                print(f"⏸️ إيقاف المفتاح {cred.masked_key()} مؤقتاً لمدة {self.cooldown_seconds} ثانية")
+
+    def usage(self) -> List[Dict[str, Any]]:
+        """تقرير الاستخدام لكل مفتاح (بدون المعلومات الحساسة)"""
+        with self._lock:
+            now = time.time()
+            return [
+                {
+                    "app_key": c.masked_key(),
+                    "tracking_id": c.masked_tracking_id(),
+                    "calls_in_window": c.calls_in_window,
+                    "remaining_quota": c.remaining_quota(now),
+                    "total_calls": c.total_calls,
+                    "total_errors": c.total_errors,
+                    "rate_limited": c.rate_limited,
+                    "error_rate": round(c.error_rate(), 3),
+                    "cooling_down": c.cooldown_until > now,
+                }
+                for c in self._credentials
+            ]
+
+    def export_state(self) -> Dict[str, Dict[str, float]]:
+        """عدادات الحصة لكل مفتاح لحفظها في لقطة الحالة الدافئة"""
+        with self._lock:
+            return {
+                c.fingerprint(): {
+                    "window_start": c.window_start,
+                    "calls_in_window": c.calls_in_window,
+                    "total_calls": c.total_calls,
+                    "total_errors": c.total_errors,
+                    "rate_limited": c.rate_limited,
+                    "cooldown_until": c.cooldown_until,
+                }
+                for c in self._credentials
+            }
+
+    def import_state(self, state: Dict[str, Dict[str, float]]) -> None:
+        """استعادة العدادات من لقطة سابقة (تُضاف إلى ما سُجل منذ التشغيل)"""
+        with self._lock:
+            for c in self._credentials:
+                saved = state.get(c.fingerprint())
+                if not saved:
+                    continue
+                c.total_calls += int(saved.get("total_calls", 0))
+                c.total_errors += int(saved.get("total_errors", 0))
+                c.rate_limited += int(saved.get("rate_limited", 0))
+                c.cooldown_until = max(c.cooldown_until, float(saved.get("cooldown_until", 0)))
+                if time.time() - float(saved.get("window_start", 0)) < QUOTA_WINDOW_SECONDS:
+                    c.window_start = float(saved["window_start"])
+                    c.calls_in_window += int(saved.get("calls_in_window", 0))
+                self.restored = True
+
+    def __len__(self) -> int:
+        return len(self._credentials)
+
+
+def parse_credentials(raw: Optional[str]) -> List[Dict[str, str]]:
+    """
+    تحليل قائمة المفاتيح من متغير بيئي بالصيغة:
+    key1:secret1:tracking1,key2:secret2:tracking2
+    """
+    credentials: List[Dict[str, str]] = []
+    if not raw:
+        return credentials
+    for item in raw.split(","):
+        parts = [p.strip() for p in item.strip().split(":")]
+        if len(parts) != 3 or not all(parts):
+            print("⚠️ تم تجاهل بيانات اعتماد غير صالحة في AE_CREDENTIALS")
+            continue
+        app_key, app_secret, tracking_id = parts
+        credentials.append(
+            {"app_key": app_key, "app_secret": app_secret, "tracking_id": tracking_id}
+        )
+    return credentials
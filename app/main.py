@@ -1,9 +1,22 @@
-from flask import Flask, jsonify, request
-from .config import POST_PREFIX_TEXT
+import atexit
+from flask import Flask, jsonify, request, has_request_context
+from .config import (
+    POST_PREFIX_TEXT,
+    REVALIDATION_ENABLED,
+    PROFILE_REQUESTS,
+    WARM_STATE_ENABLED,
+    PUBLISH_DEADLINE_SECONDS,
+    TEST_SHORTEN_DEADLINE_SECONDS,
+)
 from .coupons import CouponManager
 from .telegram_bot import TelegramBot
 from .product_selector import ProductSelector
 from .aliexpress_api import AliExpressApiClient
+from .product_revalidator import ProductRevalidator
+from .tracing import start_trace, finish_trace, profile_header_allowed
+from .warm_state import WarmStateSnapshot
+from .sent_products import SentProductsStore
+from .admission import AdmissionGate, DeadlineExceeded, check_deadline
 
 
 def create_app():
@@ -12,12 +25,67 @@ def create_app():
     coupon_manager = CouponManager()
     telegram_bot = TelegramBot()
     ali_client = AliExpressApiClient()
-    product_selector = ProductSelector(ali_client)
+    product_selector = ProductSelector(ali_client, coupon_manager)
+    sent_store = SentProductsStore()
+    # بوابة مشتركة للمسارات التي تنفذ طلبات خارجية، حتى لا تحجز كل الخيوط
+    admission_gate = AdmissionGate()
+    # تكلفة النشر تشمل فقط طلبات API داخل /publish؛ طلبات إعادة التحقق في الخلفية
+    # و/test-shorten تُسجل منفصلة حتى لا تشوه api_cost_per_post
+    ali_client.on_request = lambda method: sent_store.stats.record_api_call(
+        background=not (has_request_context() and request.endpoint == "publish")
+    )
+    atexit.register(sent_store.flush)
+
+    # إعادة التحقق من المنتجات المخزنة في الخلفية بعيداً عن مسار النشر
+    revalidator = ProductRevalidator(product_selector, ali_client)
+    if REVALIDATION_ENABLED:
+        revalidator.start()
+
+    # لقطات الحالة الدافئة: تُحمَّل عند أول طلب وتُحفظ دورياً وعند الإيقاف
+    warm_state = WarmStateSnapshot(product_selector, ali_client)
+    if WARM_STATE_ENABLED:
+        warm_state.start()
+
+    # تتبع زمن كل مرحلة في الطلب، مع تحليل cProfile اختياري
+    @app.before_request
+    def begin_request_trace():
+        if request.endpoint == "health":
+            return
+        if WARM_STATE_ENABLED:
+            warm_state.ensure_loaded()
+        profile = PROFILE_REQUESTS or profile_header_allowed(request.headers.get("X-Profile"))
+        start_trace(request.path, profile=profile)
+
+    @app.teardown_request
+    def end_request_trace(exc=None):
+        finish_trace()
 
     @app.route("/health", methods=["GET"])
     def health():
         return jsonify({"status": "ok"}), 200
 
+    @app.route("/api-usage", methods=["GET"])
+    def api_usage():
+        """استخدام كل مفتاح AliExpress في مجموعة المفاتيح"""
+        pool = ali_client.credential_pool
+        return jsonify({
+            "status": "ok",
+            "keys": pool.usage(),
+            # العدادات في الذاكرة فقط ما لم تُستعد من لقطة الحالة؛ بدونها
+            # تبدأ من الصفر بعد كل تشغيل بارد وتكون الحصة المتبقية مبالغاً فيها
+            "counters_restored_from_snapshot": pool.restored,
+        }), 200
+
+    @app.route("/stats", methods=["GET"])
+    def stats():
+        """إحصائيات النشر لكل نافذة زمنية وفئة ونسبة الكوبونات وتكلفة API"""
+        return jsonify({
+            "status": "ok",
+            **sent_store.get_stats(),
+            "category_searches": product_selector.export_category_stats(),
+            "admission": admission_gate.stats(),
+        }), 200
+
     @app.route("/ali-callback", methods=["GET"])
     def ali_callback():
         code = request.args.get("code")
@@ -25,11 +93,14 @@ def create_app():
         return jsonify({"status": "ok", "code": code}), 200
 
     @app.route("/publish", methods=["GET"])
+    @admission_gate.limit(PUBLISH_DEADLINE_SECONDS)
     def publish():
         try:
             # 1) اختيار منتج
             product = product_selector.get_random_product()
+            check_deadline()
             if not product:
+                sent_store.record_failure()
                 return jsonify({"status": "error", "message": "No products found"}), 500
 
             title = product.get("title")
@@ -42,6 +113,7 @@ def create_app():
             
             # استخدام AliExpress API لإنشاء رابط تابع مختصر
             affiliate_url = ali_client.generate_affiliate_link(product_url)
+            check_deadline()
             
             if affiliate_url == product_url:
                 print("❌ فشل في إنشاء رابط مختصر، استخدام الرابط الأصلي")
@@ -82,6 +154,13 @@ def create_app():
             else:
                 telegram_bot.send_text(text=message_text)
 
+            # 6) تسجيل النشر في السجل والإحصائيات
+            sent_store.mark_sent(
+                product.get("id"),
+                category=product.get("category"),
+                coupon_code=coupon.get("code") if coupon else None,
+            )
+
             return jsonify({
                 "status": "ok", 
                 "original_url": product_url,
@@ -90,18 +169,24 @@ def create_app():
                 "message": "تم النشر بنجاح" if affiliate_url != product_url else "تم النشر ولكن الرابط لم يتم تقصيره"
             }), 200
 
+        except DeadlineExceeded:
+            sent_store.record_failure()
+            raise
         except Exception as e:
             print("PUBLISH ERROR:", repr(e))
+            sent_store.record_failure()
             return jsonify({"status": "error", "message": str(e)}), 500
 
     # إضافة نقطة نهاية جديدة لاختبار تقصير الروابط
     @app.route("/test-shorten", methods=["GET"])
+    @admission_gate.limit(TEST_SHORTEN_DEADLINE_SECONDS)
     def test_shorten():
         """اختبار تقصير الروابط"""
         test_url = request.args.get("url", "https://www.aliexpress.com/item/1005001234567890.html")
         
         try:
-            short_url = ali_client.generate_affiliate_link(test_url)
+            # بدون تخزين: الهدف اختبار طلب تقصير حقيقي، ولا نريد أن يملأ أي رابط يرسله المستخدم الذاكرة
+            short_url = ali_client.generate_affiliate_link(test_url, use_cache=False)
             
             return jsonify({
                 "original_url": test_url,
@@ -112,6 +197,8 @@ def create_app():
                 "success": short_url != test_url
             })
             
+        except DeadlineExceeded:
+            raise
         except Exception as e:
             return jsonify({"error": str(e)}), 500
 
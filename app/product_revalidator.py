@@ -0,0 +1,86 @@
+import threading
+from typing import Optional, Tuple
+from .config import (
+    REVALIDATION_INTERVAL_SECONDS,
+    REVALIDATION_BATCH_SIZE,
+    REVALIDATION_MIN_AGE_SECONDS,
+    REVALIDATION_MAX_BATCHES_PER_CYCLE,
+)
+from .aliexpress_api import AliExpressApiClient
+from .product_selector import ProductSelector
+
+
+class ProductRevalidator:
+    """
+    خيط خلفي منخفض الأولوية يعيد التحقق من المنتجات المخزنة مؤقتاً على دفعات،
+    فيحذف المنتجات المحذوفة ويحدّث الأسعار والروابط قبل وصولها لمسار النشر.
+    """
+
+    def __init__(
+        self,
+        selector: ProductSelector,
+        ali_client: AliExpressApiClient,
+        interval_seconds: int = REVALIDATION_INTERVAL_SECONDS,
+        batch_size: int = REVALIDATION_BATCH_SIZE,
+        batch_pause_seconds: float = 1.0,
+        min_age_seconds: int = REVALIDATION_MIN_AGE_SECONDS,
+        max_batches_per_cycle: int = REVALIDATION_MAX_BATCHES_PER_CYCLE,
+    ):
+        self.selector = selector
+        self.ali_client = ali_client
+        self.interval_seconds = interval_seconds
+        self.batch_size = max(1, batch_size)
+        self.batch_pause_seconds = batch_pause_seconds
+        self.min_age_seconds = min_age_seconds
+        self.max_batches_per_cycle = max(1, max_batches_per_cycle)
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def run_once(self) -> Tuple[int, int]:
+        """
+        دورة تحقق واحدة على المنتجات التي تجاوزت min_age_seconds منذ آخر تحقق،
+        بحد أقصى max_batches_per_cycle دفعة. يرجع (المحدّث، المحذوف).
+        """
+        product_ids = self.selector.get_cached_product_ids(self.min_age_seconds)
+        product_ids = product_ids[:self.batch_size * self.max_batches_per_cycle]
+        total_updated = total_evicted = 0
+
+        for start in range(0, len(product_ids), self.batch_size):
+            if self._stop_event.is_set():
+                break
+
+            batch = product_ids[start:start + self.batch_size]
+            fresh = self.ali_client.get_product_details(batch)
+            if fresh is None:
+                # فشل الطلب: لا نحذف شيئاً ونترك الدفعة للدورة القادمة
+                continue
+
+            updated, evicted = self.selector.apply_revalidation(fresh, set(batch))
+            total_updated += updated
+            total_evicted += evicted
+
+            # مهلة قصيرة بين الدفعات حتى لا ننافس مسار النشر على حصة API
+            self._stop_event.wait(self.batch_pause_seconds)
+
+        if product_ids:
+            print(f"🔄 إعادة التحقق: تم تحديث {total_updated} وحذف {total_evicted} منتج")
+        return total_updated, total_evicted
+
+    def _run(self) -> None:
+        while not self._stop_event.wait(self.interval_seconds):
+            try:
+                self.run_once()
+            except Exception as e:
+                print(f"❌ خطأ في إعادة التحقق من المنتجات: {e}")
+
+    def start(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(
+            target=self._run, name="product-revalidator", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop_event.set()
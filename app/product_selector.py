@@ -1,46 +1,236 @@
 import random
-from typing import Dict, Any, Optional, List
-from .config import PRODUCT_CATEGORIES, ALI_PRODUCTS_FETCH_LIMIT
+import threading
+import time
+from typing import Dict, Any, Optional, List, Set, Tuple
+from .config import (
+    PRODUCT_CATEGORIES,
+    ALI_PRODUCTS_FETCH_LIMIT,
+    MIN_PRODUCT_PRICE,
+    MAX_PRODUCT_PRICE,
+    PRODUCT_CACHE_TTL_SECONDS,
+    MIN_PRICE_BAND_WIDTH,
+)
 from .aliexpress_api import AliExpressApiClient
+from .coupons import CouponManager
+from .tracing import traced
+from .admission import DeadlineExceeded
+
+PriceBand = Tuple[float, float]
 
 
 class ProductSelector:
-    def __init__(self, ali_client: AliExpressApiClient):
+    def __init__(
+        self,
+        ali_client: AliExpressApiClient,
+        coupon_manager: Optional[CouponManager] = None,
+        cache_ttl_seconds: int = PRODUCT_CACHE_TTL_SECONDS,
+    ):
         self.ali_client = ali_client
+        self.coupon_manager = coupon_manager
+        self.cache_ttl_seconds = cache_ttl_seconds
+        # مفتاح التخزين: (اسم الفئة، الحد الأدنى، الحد الأعلى) -> (وقت الجلب، المنتجات)
+        self._band_cache: Dict[Tuple[str, float, float], Tuple[float, List[Dict[str, Any]]]] = {}
+        # يحمي التخزين المؤقت من التعديل المتزامن بواسطة خيط إعادة التحقق
+        self._cache_lock = threading.Lock()
+        # إحصائيات البحث لكل فئة: {"searches": عدد عمليات البحث، "empty": عدد النتائج الفارغة}
+        self.category_stats: Dict[str, Dict[str, int]] = {}
 
     def choose_random_category(self) -> Dict[str, Any]:
         return random.choice(PRODUCT_CATEGORIES)
 
-    def get_products_for_category(self, category: Dict[str, Any]) -> List[Dict[str, Any]]:
-        """جلب المنتجات للفئة مع معالجة الأخطاء المبسطة"""
+    def get_price_bands(self) -> List[PriceBand]:
+        """الشرائح السعرية المستخدمة في البحث، مشتقة من شرائح الكوبونات"""
+        if self.coupon_manager is None:
+            return [(MIN_PRODUCT_PRICE, MAX_PRODUCT_PRICE)]
+        bands = [
+            (low, high)
+            for low, high in self.coupon_manager.get_price_bands(MIN_PRODUCT_PRICE, MAX_PRODUCT_PRICE)
+            if high - low >= MIN_PRICE_BAND_WIDTH
+        ]
+        return bands or [(MIN_PRODUCT_PRICE, MAX_PRODUCT_PRICE)]
+
+    def choose_random_band(self) -> PriceBand:
+        return random.choice(self.get_price_bands())
+
+    def _get_cached(self, key: Tuple[str, float, float]) -> Optional[List[Dict[str, Any]]]:
+        with self._cache_lock:
+            entry = self._band_cache.get(key)
+            if entry is None:
+                return None
+            fetched_at, products = entry
+            if time.time() - fetched_at > self.cache_ttl_seconds:
+                self._band_cache.pop(key, None)
+                return None
+            return products
+
+    def export_cache(self) -> List[Dict[str, Any]]:
+        """تصدير نتائج البحث المخزنة بصيغة قابلة للتحويل إلى JSON"""
+        with self._cache_lock:
+            return [
+                {"key": list(key), "fetched_at": fetched_at, "products": products}
+                for key, (fetched_at, products) in self._band_cache.items()
+            ]
+
+    def import_cache(self, entries: List[Dict[str, Any]]) -> int:
+        """استيراد نتائج مخزنة من لقطة سابقة، مع تجاهل المنتهية الصلاحية"""
+        now = time.time()
+        loaded = 0
+        with self._cache_lock:
+            for entry in entries:
+                fetched_at = float(entry.get("fetched_at", 0))
+                if now - fetched_at > self.cache_ttl_seconds:
+                    continue
+                key = tuple(entry["key"])
+                if key not in self._band_cache:
+                    self._band_cache[key] = (fetched_at, entry.get("products", []))
+                    loaded += 1
+        return loaded
+
+    def _record_search(self, category_name: str, found: bool) -> None:
+        with self._cache_lock:
+            stats = self.category_stats.setdefault(category_name, {"searches": 0, "empty": 0})
+            stats["searches"] += 1
+            if not found:
+                stats["empty"] += 1
+
+    def export_category_stats(self) -> Dict[str, Dict[str, int]]:
+        """نسخة من إحصائيات الفئات آمنة للقراءة من خيط آخر"""
+        with self._cache_lock:
+            return {name: dict(stats) for name, stats in self.category_stats.items()}
+
+    def import_category_stats(self, saved: Dict[str, Dict[str, int]]) -> None:
+        with self._cache_lock:
+            for name, stats in saved.items():
+                self.category_stats.setdefault(name, dict(stats))
+
+    def get_cached_product_ids(self, min_age_seconds: float = 0) -> List[str]:
+        """
+        معرّفات المنتجات المخزنة مؤقتاً التي مر على آخر تحقق منها min_age_seconds
+        على الأقل، الأقدم تحققاً أولاً.
+        """
+        cutoff = time.time() - min_age_seconds
+        with self._cache_lock:
+            products = [
+                p for _, items in self._band_cache.values() for p in items
+                if p.get("validated_ts", 0) <= cutoff
+            ]
+        products.sort(key=lambda p: p.get("validated_ts", 0))
+        seen: Set[str] = set()
+        ids: List[str] = []
+        for p in products:
+            pid = str(p.get("id"))
+            if pid not in seen:
+                seen.add(pid)
+                ids.append(pid)
+        return ids
+
+    def apply_revalidation(
+        self, fresh: Dict[str, Dict[str, Any]], checked_ids: Set[str]
+    ) -> Tuple[int, int]:
+        """
+        تطبيق نتائج إعادة التحقق على التخزين المؤقت:
+        - حذف المنتجات التي تم فحصها ولم تعد موجودة أو فقدت الكوبون المناسب.
+        - تحديث السعر والرابط والصورة للمنتجات المتاحة.
+        يرجع (عدد المحدّث، عدد المحذوف).
+        """
+        updated = evicted = 0
+        now = time.time()
+        with self._cache_lock:
+            for key, (fetched_at, products) in list(self._band_cache.items()):
+                kept: List[Dict[str, Any]] = []
+                for p in products:
+                    pid = str(p.get("id"))
+                    if pid not in checked_ids:
+                        kept.append(p)
+                        continue
+                    latest = fresh.get(pid)
+                    if latest is None:
+                        evicted += 1
+                        continue
+                    refreshed = {**p, **{k: v for k, v in latest.items() if v}}
+                    refreshed["validated_ts"] = now
+                    if not self._has_coupon(refreshed):
+                        evicted += 1
+                        continue
+                    kept.append(refreshed)
+                    updated += 1
+                if kept:
+                    self._band_cache[key] = (fetched_at, kept)
+                else:
+                    self._band_cache.pop(key, None)
+        return updated, evicted
+
+    def _has_coupon(self, product: Dict[str, Any]) -> bool:
+        if self.coupon_manager is None:
+            return True
+        try:
+            price = float(product.get("original_price") or 0)
+        except (TypeError, ValueError):
+            return False
+        return self.coupon_manager.find_range(price) is not None
+
+    @traced("selector.get_products_for_category")
+    def get_products_for_category(
+        self, category: Dict[str, Any], price_band: Optional[PriceBand] = None
+    ) -> List[Dict[str, Any]]:
+        """جلب المنتجات للفئة ضمن شريحة سعرية مع تخزين النتائج مؤقتاً"""
+        min_price, max_price = price_band or (None, None)
+        key = (str(category.get("name")), min_price, max_price)
+
+        cached = self._get_cached(key)
+        if cached is not None:
+            print(f"♻️ استخدام نتائج مخزنة للفئة {category.get('name')} ({min_price} - {max_price})")
+            return cached
+
         try:
             products = self.ali_client.search_products(
                 category_info=category,
                 limit=ALI_PRODUCTS_FETCH_LIMIT,
-            )
-            return products or []
+                min_price=min_price,
+                max_price=max_price,
+            ) or []
+        except DeadlineExceeded:
+            raise
         except Exception as e:
             print(f"❌ خطأ في جلب المنتجات للفئة {category.get('name')}: {e}")
             return []
 
+        # استبعاد المنتجات التي لا يوجد لها كوبون مناسب (قد لا يلتزم API بحدود السعر)
+        # نتائج البحث حديثة بطبيعتها، فتُعتبر متحققاً منها لحظة الجلب
+        fetched_at = time.time()
+        products = [
+            {**p, "category": category.get("name"), "validated_ts": fetched_at}
+            for p in products if self._has_coupon(p)
+        ]
+        self._record_search(key[0], bool(products))
+        if products:
+            with self._cache_lock:
+                self._band_cache[key] = (fetched_at, products)
+        return products
+
+    @traced("selector.get_random_product")
     def get_random_product(self, max_attempts: int = 3) -> Optional[Dict[str, Any]]:
-        """اختيار منتج عشوائي - نسخة مبسطة"""
+        """اختيار منتج عشوائي من فئة وشريحة سعرية عشوائيتين"""
         attempts = 0
-        
+
         while attempts < max_attempts:
             attempts += 1
-            
+
             category = self.choose_random_category()
-            print(f"🔍 محاولة {attempts}: البحث في فئة {category.get('name')}")
-            
-            products = self.get_products_for_category(category)
-            
+            price_band = self.choose_random_band()
+            print(
+                f"🔍 محاولة {attempts}: البحث في فئة {category.get('name')} "
+                f"بسعر {price_band[0]} - {price_band[1]}"
+            )
+
+            products = self.get_products_for_category(category, price_band)
+
             if products:
                 selected_product = random.choice(products)
                 print(f"✅ تم اختيار منتج: {selected_product.get('title')}")
                 return selected_product
             else:
                 print(f"⚠️ لا توجد منتجات في الفئة {category.get('name')}")
-        
+
         print(f"❌ فشل في العثور على منتج مناسب بعد {max_attempts} محاولات")
         return None
@@ -0,0 +1,185 @@
+import json
+import math
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+CATEGORY_PREFIX = "category:"
+
+# النوافذ الزمنية المعروضة: الاسم -> مدة النافذة بالثواني
+STATS_WINDOWS = {
+    "1h": 60 * 60,
+    "24h": 24 * 60 * 60,
+    "7d": 7 * 24 * 60 * 60,
+}
+
+
+class BucketRing:
+    """
+    مخزن دائري ثابت الحجم من العدادات الزمنية: كل خانة تمثل فترة (دقيقة/ساعة)
+    وتُعاد كتابتها تلقائياً عند مرور دورة كاملة، فالاستعلام O(عدد الخانات).
+    """
+
+    def __init__(self, bucket_seconds: int, size: int):
+        self.bucket_seconds = bucket_seconds
+        self.size = size
+        # كل خانة: [رقم الفترة، العدادات] أو None
+        self._slots: List[Optional[List[Any]]] = [None] * size
+
+    @property
+    def span_seconds(self) -> int:
+        return self.bucket_seconds * self.size
+
+    def add(self, ts: float, counters: Dict[str, int]) -> None:
+        index = int(ts // self.bucket_seconds)
+        slot = index % self.size
+        entry = self._slots[slot]
+        if entry is not None and entry[0] > index:
+            # حدث أقدم من مدى هذا المخزن: الخانة أصبحت لفترة أحدث
+            return
+        if entry is None or entry[0] != index:
+            entry = [index, {}]
+            self._slots[slot] = entry
+        bucket = entry[1]
+        for key, value in counters.items():
+            bucket[key] = bucket.get(key, 0) + value
+
+    def total(self, now: float, window_seconds: int) -> Dict[str, int]:
+        """
+        مجموع العدادات للنافذة: الخانة الحالية (الجزئية) مع الخانات الكاملة التي تغطي
+        window_seconds، فلا يسقط أي حدث داخل النافذة، وقد يُحسب ما يصل إلى خانة واحدة
+        أقدم منها (مثلاً نافذة 24h تغطي بين 24 و25 ساعة).
+        """
+        current = int(now // self.bucket_seconds)
+        count = min(self.size, math.ceil(window_seconds / self.bucket_seconds) + 1)
+        totals: Dict[str, int] = {}
+        for entry in self._slots:
+            if entry is None or not 0 <= current - entry[0] < count:
+                continue
+            for key, value in entry[1].items():
+                totals[key] = totals.get(key, 0) + value
+        return totals
+
+    def to_list(self) -> List[List[Any]]:
+        return [[entry[0], dict(entry[1])] for entry in self._slots if entry is not None]
+
+    def load_list(self, entries: List[List[Any]]) -> None:
+        for index, counters in entries:
+            self._slots[int(index) % self.size] = [int(index), dict(counters)]
+
+
+class PublishStats:
+    """
+    إحصائيات النشر المحدّثة تدريجياً: دقائق لآخر ساعة وساعات لآخر أسبوع.
+    تُحفظ في ملف صغير خاص بها (منفصل عن سجل المنتجات) بحد أقصى مرة كل
+    flush_interval_seconds عند التسجيل، وفوراً عند استدعاء save().
+    """
+
+    def __init__(self, path: Optional[Path] = None, flush_interval_seconds: float = 60):
+        # خانة إضافية في كل مخزن للفترة الحالية غير المكتملة
+        self._minutes = BucketRing(60, 60 + 1)
+        self._hours = BucketRing(60 * 60, 24 * 7 + 1)
+        self._lock = threading.Lock()
+        self.path = Path(path) if path is not None else None
+        self.flush_interval_seconds = flush_interval_seconds
+        self._dirty = False
+        self._last_save = time.monotonic()
+
+    def _ring_for(self, window_seconds: int) -> BucketRing:
+        if window_seconds < self._minutes.span_seconds:
+            return self._minutes
+        return self._hours
+
+    def record_counters(self, counters: Dict[str, int], ts: Optional[float] = None) -> None:
+        ts = time.time() if ts is None else ts
+        with self._lock:
+            self._minutes.add(ts, counters)
+            self._hours.add(ts, counters)
+            self._dirty = True
+            due = time.monotonic() - self._last_save >= self.flush_interval_seconds
+        if due:
+            self.save()
+
+    def record_post(
+        self,
+        category: Optional[str] = None,
+        coupon_code: Optional[str] = None,
+        ts: Optional[float] = None,
+    ) -> None:
+        counters = {"posts": 1, "coupon_hits": 1 if coupon_code else 0}
+        if category:
+            counters[f"{CATEGORY_PREFIX}{category}"] = 1
+        self.record_counters(counters, ts)
+
+    def record_failure(self, ts: Optional[float] = None) -> None:
+        self.record_counters({"failures": 1}, ts)
+
+    def record_api_call(self, ts: Optional[float] = None, background: bool = False) -> None:
+        """طلبات API أثناء /publish تُحسب في تكلفة النشر، وغيرها (الخلفية والتشخيص) منفصلة"""
+        self.record_counters({"background_api_calls" if background else "api_calls": 1}, ts)
+
+    def window(self, window_seconds: int, now: Optional[float] = None) -> Dict[str, Any]:
+        now = time.time() if now is None else now
+        with self._lock:
+            totals = self._ring_for(window_seconds).total(now, window_seconds)
+
+        posts = totals.get("posts", 0)
+        api_calls = totals.get("api_calls", 0)
+        return {
+            "posts": posts,
+            "failures": totals.get("failures", 0),
+            "coupon_hit_rate": round(totals.get("coupon_hits", 0) / posts, 3) if posts else None,
+            "api_calls": api_calls,
+            "api_cost_per_post": round(api_calls / posts, 2) if posts else None,
+            "background_api_calls": totals.get("background_api_calls", 0),
+            "by_category": {
+                key[len(CATEGORY_PREFIX):]: value
+                for key, value in totals.items()
+                if key.startswith(CATEGORY_PREFIX)
+            },
+        }
+
+    def summary(self, now: Optional[float] = None) -> Dict[str, Any]:
+        now = time.time() if now is None else now
+        return {name: self.window(seconds, now) for name, seconds in STATS_WINDOWS.items()}
+
+    def to_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"minutes": self._minutes.to_list(), "hours": self._hours.to_list()}
+
+    def load_dict(self, data: Dict[str, Any]) -> None:
+        with self._lock:
+            self._minutes.load_list(data.get("minutes", []))
+            self._hours.load_list(data.get("hours", []))
+
+    def load(self) -> bool:
+        """تحميل العدادات من الملف. يرجع False إذا لم يوجد ملف صالح."""
+        if self.path is None or not self.path.exists():
+            return False
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                self.load_dict(json.load(f))
+            return True
+        except Exception as e:
+            print(f"❌ خطأ في تحميل الإحصائيات: {e}")
+            return False
+
+    def save(self) -> None:
+        """حفظ العدادات إذا تغيرت منذ آخر حفظ"""
+        if self.path is None:
+            return
+        with self._lock:
+            if not self._dirty:
+                return
+            data = {"minutes": self._minutes.to_list(), "hours": self._hours.to_list()}
+            self._dirty = False
+            self._last_save = time.monotonic()
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.path.with_name(self.path.name + ".tmp")
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(data, f, separators=(",", ":"))
+            tmp_path.replace(self.path)
+        except Exception as e:
+            print(f"❌ خطأ في حفظ الإحصائيات: {e}")
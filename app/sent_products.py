@@ -1,33 +1,60 @@
 import json
+import threading
 import time
 from pathlib import Path
-from typing import Dict, Any, List
-from .config import SENT_PRODUCTS_FILE
+from typing import Dict, Any, List, Optional
+from .config import SENT_PRODUCTS_FILE, PUBLISH_STATS_FILE
+from .publish_stats import PublishStats
 
 DEFAULT_TTL_SECONDS = 7 * 24 * 60 * 60  # 7 أيام
 
 class SentProductsStore:
-    def __init__(self, path: Path = SENT_PRODUCTS_FILE, max_products: int = 10000):
+    def __init__(
+        self,
+        path: Path = SENT_PRODUCTS_FILE,
+        max_products: int = 10000,
+        stats_path: Path = PUBLISH_STATS_FILE,
+    ):
         self.path = Path(path)
         self.max_products = max_products
         self.data: Dict[str, Any] = {"products": []}
         self._product_index: Dict[str, Dict[str, Any]] = {}
+        self.stats = PublishStats(stats_path)
+        self._file_size = 0
+        # يمنع تداخل الكتابة عند تنفيذ أكثر من نشر بالتوازي
+        self._save_lock = threading.Lock()
         self._load()
 
     def _load(self) -> None:
         if not self.path.exists():
             self._save()
+            self.stats.load()
             return
         try:
             with open(self.path, "r", encoding="utf-8") as f:
                 self.data = json.load(f)
+            # الإحصائيات لها ملف مستقل ولا تُخزن في سجل المنتجات
+            self.data.pop("stats", None)
             self._rebuild_index()
+            self._load_stats()
+            self._file_size = self.path.stat().st_size
         except Exception as e:
             print(f"❌ خطأ في تحميل البيانات: {e}")
             self.data = {"products": []}
             self._product_index = {}
+            self.stats = PublishStats(self.stats.path)
             self._save()
 
+    def _load_stats(self) -> None:
+        """تحميل الإحصائيات من ملفها، أو بناؤها مرة واحدة من السجل القديم"""
+        if self.stats.load():
+            return
+        for p in self.data.get("products", []):
+            ts = p.get("last_sent_ts")
+            if ts:
+                self.stats.record_post(p.get("category"), ts=ts)
+        self.stats.save()
+
     def _rebuild_index(self):
         """إعادة بناء الفهرس للبحث السريع"""
         self._product_index = {
@@ -37,8 +64,10 @@ class SentProductsStore:
     def _save(self) -> None:
         self.path.parent.mkdir(parents=True, exist_ok=True)
         try:
-            with open(self.path, "w", encoding="utf-8") as f:
-                json.dump(self.data, f, ensure_ascii=False, indent=2)
+            with self._save_lock:
+                with open(self.path, "w", encoding="utf-8") as f:
+                    json.dump(self.data, f, ensure_ascii=False, indent=2)
+                    self._file_size = f.tell()
         except Exception as e:
             print(f"❌ خطأ في حفظ البيانات: {e}")
 
@@ -57,14 +86,22 @@ class SentProductsStore:
         self.data["products"] = sorted_products[-self.max_products:]
         self._rebuild_index()
 
-    def mark_sent(self, product_id: str) -> None:
+    def mark_sent(
+        self,
+        product_id: str,
+        category: Optional[str] = None,
+        coupon_code: Optional[str] = None,
+    ) -> None:
         product_id = str(product_id)
         ts = self._now_ts()
+        self.stats.record_post(category, coupon_code, ts=ts)
         
         if product_id in self._product_index:
             self._product_index[product_id]["last_sent_ts"] = ts
         else:
             new_product = {"id": product_id, "last_sent_ts": ts}
+            if category:
+                new_product["category"] = category
             self.data.setdefault("products", []).append(new_product)
             self._product_index[product_id] = new_product
             
@@ -72,6 +109,16 @@ class SentProductsStore:
                 self._auto_cleanup()
 
         self._save()
+        self.stats.save()
+
+    def record_failure(self) -> None:
+        """تسجيل نشر فاشل وحفظ الإحصائيات فوراً حتى لا يضيع عند إعادة التشغيل"""
+        self.stats.record_failure()
+        self.stats.save()
+
+    def flush(self) -> None:
+        """حفظ العدادات غير المحفوظة (مثل طلبات API بعد آخر نشر)"""
+        self.stats.save()
 
     def was_sent_recently(self, product_id: str, ttl_seconds: int) -> bool:
         product_id = str(product_id)
@@ -97,16 +144,13 @@ class SentProductsStore:
         self._save()
 
     def get_stats(self) -> Dict[str, Any]:
-        """الحصول على إحصائيات التخزين"""
-        now = self._now_ts()
-        products = self.data.get("products", [])
-        
-        recent_24h = [p for p in products if now - p.get("last_sent_ts", 0) <= 86400]
-        recent_7d = [p for p in products if now - p.get("last_sent_ts", 0) <= 604800]
+        """الحصول على إحصائيات التخزين (من العدادات الزمنية دون فحص السجل كاملاً)"""
+        windows = self.stats.summary()
         
         return {
-            "total_products": len(products),
-            "recent_24h": len(recent_24h),
-            "recent_7d": len(recent_7d),
-            "file_size_kb": self.path.stat().st_size / 1024 if self.path.exists() else 0,
+            "total_products": len(self._product_index),
+            "recent_24h": windows["24h"]["posts"],
+            "recent_7d": windows["7d"]["posts"],
+            "file_size_kb": self._file_size / 1024,
+            "windows": windows,
         }
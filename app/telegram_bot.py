@@ -1,6 +1,8 @@
 import requests
 from typing import Optional
 from .config import TELEGRAM_BOT_TOKEN, TELEGRAM_CHANNEL_ID
+from .tracing import traced
+from .admission import remaining_timeout
 
 TELEGRAM_API_BASE = "https://api.telegram.org"
 
@@ -42,6 +44,7 @@ class TelegramBot:
 
         return text
 
+    @traced("telegram.send_text")
     def send_text(
         self,
         text: str,
@@ -63,7 +66,7 @@ class TelegramBot:
         if parse_mode:
             payload["parse_mode"] = parse_mode
 
-        resp = requests.post(url, json=payload, timeout=15)
+        resp = requests.post(url, json=payload, timeout=remaining_timeout(15))
         try:
             print("TELEGRAM SEND_MESSAGE:", resp.status_code, resp.text)
         except Exception:
@@ -71,6 +74,7 @@ class TelegramBot:
         resp.raise_for_status()
         return resp.json()
 
+    @traced("telegram.send_photo_with_caption")
     def send_photo_with_caption(
         self,
         photo_url: str,
@@ -93,7 +97,7 @@ class TelegramBot:
 
         print("DEBUG TELEGRAM PAYLOAD:", payload)
 
-        resp = requests.post(url, json=payload, timeout=20)
+        resp = requests.post(url, json=payload, timeout=remaining_timeout(20))
         try:
             print("DEBUG TELEGRAM RESPONSE:", resp.status_code, resp.text)
         except Exception:
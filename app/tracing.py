@@ -0,0 +1,153 @@
+import cProfile
+import functools
+import hmac
+import io
+import json
+import pstats
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, List, Optional
+from .config import (
+    TRACES_DIR,
+    SLOW_REQUEST_THRESHOLD_SECONDS,
+    PROFILE_HEADER_SECRET,
+    TRACES_MAX_FILES,
+)
+
+_local = threading.local()
+
+
+class RequestTrace:
+    """تتبع طلب واحد: قائمة المقاطع (spans) مع توقيتها وعمقها، وملف تعريف اختياري"""
+
+    def __init__(self, name: str, profile: bool = False):
+        self.name = name
+        self.started_at = time.time()
+        self._start = time.perf_counter()
+        self.spans: List[Dict[str, Any]] = []
+        self.depth = 0
+        self.duration: Optional[float] = None
+        self.profiler: Optional[cProfile.Profile] = cProfile.Profile() if profile else None
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self._start
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "started_at": self.started_at,
+            "duration_ms": round((self.duration or self.elapsed()) * 1000, 2),
+            "spans": self.spans,
+        }
+
+
+def profile_header_allowed(header_value: Optional[str]) -> bool:
+    """الترويسة X-Profile تُقبل فقط إذا طابقت السر المضبوط في PROFILE_HEADER_SECRET"""
+    if not PROFILE_HEADER_SECRET or not header_value:
+        return False
+    # المقارنة على البايتات: compare_digest يرفض النصوص غير ASCII، وWerkzeug
+    # يفك الترويسات بترميز latin-1 فيسهل إرسالها
+    return hmac.compare_digest(header_value.encode("utf-8"), PROFILE_HEADER_SECRET.encode("utf-8"))
+
+
+def current_trace() -> Optional[RequestTrace]:
+    return getattr(_local, "trace", None)
+
+
+def start_trace(name: str, profile: bool = False) -> RequestTrace:
+    trace = RequestTrace(name, profile=profile)
+    _local.trace = trace
+    if trace.profiler is not None:
+        trace.profiler.enable()
+    return trace
+
+
+def finish_trace(threshold_seconds: float = SLOW_REQUEST_THRESHOLD_SECONDS) -> Optional[RequestTrace]:
+    """
+    إنهاء التتبع الحالي. يُحفظ في مجلد التتبعات إذا تجاوز الحد الزمني
+    أو إذا كان التحليل (profiling) مفعلاً لهذا الطلب.
+    """
+    trace = current_trace()
+    _local.trace = None
+    if trace is None:
+        return None
+
+    trace.duration = trace.elapsed()
+    if trace.profiler is not None:
+        trace.profiler.disable()
+
+    if trace.duration >= threshold_seconds or trace.profiler is not None:
+        _dump_trace(trace)
+    return trace
+
+
+def _dump_trace(trace: RequestTrace) -> None:
+    try:
+        TRACES_DIR.mkdir(parents=True, exist_ok=True)
+        safe_name = "".join(ch if ch.isalnum() else "_" for ch in trace.name).strip("_")
+        base = TRACES_DIR / f"trace_{int(trace.started_at * 1000)}_{safe_name or 'request'}"
+
+        data = trace.to_dict()
+        if trace.profiler is not None:
+            # ملف .prof للتحليل بأدوات مثل snakeviz، وملخص نصي داخل ملف JSON
+            trace.profiler.dump_stats(str(base.with_suffix(".prof")))
+            out = io.StringIO()
+            pstats.Stats(trace.profiler, stream=out).sort_stats("cumulative").print_stats(30)
+            data["profile_summary"] = out.getvalue()
+
+        with open(base.with_suffix(".json"), "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+        print(f"🐢 تم حفظ تتبع الطلب ({data['duration_ms']} ms): {base.with_suffix('.json')}")
+        _prune_traces()
+    except Exception as e:
+        print(f"❌ خطأ في حفظ تتبع الطلب: {e}")
+
+
+def _prune_traces(max_files: Optional[int] = None) -> None:
+    """حذف أقدم التتبعات (مع ملفات .prof المرافقة) عند تجاوز الحد الأقصى"""
+    max_files = TRACES_MAX_FILES if max_files is None else max_files
+    # أسماء الملفات تبدأ بوقت البدء بالملي ثانية، فالترتيب بالاسم ترتيب زمني
+    traces = sorted(TRACES_DIR.glob("trace_*.json"))
+    for old in traces[:max(len(traces) - max_files, 0)]:
+        old.unlink(missing_ok=True)
+        old.with_suffix(".prof").unlink(missing_ok=True)
+
+
+@contextmanager
+def span(name: str, **attrs: Any):
+    """قياس زمن مقطع داخل الطلب الحالي (لا يفعل شيئاً خارج طلب متتبَّع)"""
+    trace = current_trace()
+    if trace is None:
+        yield
+        return
+
+    record: Dict[str, Any] = {
+        "name": name,
+        "depth": trace.depth,
+        "offset_ms": round(trace.elapsed() * 1000, 2),
+    }
+    if attrs:
+        record["attrs"] = attrs
+    trace.spans.append(record)
+    trace.depth += 1
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception as e:
+        record["error"] = repr(e)
+        raise
+    finally:
+        record["duration_ms"] = round((time.perf_counter() - start) * 1000, 2)
+        trace.depth -= 1
+
+
+def traced(name: str) -> Callable:
+    """مزخرف يلف الدالة في مقطع تتبع"""
+    def decorator(func: Callable) -> Callable:
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
@@ -0,0 +1,106 @@
+import atexit
+import gzip
+import json
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional
+from .config import WARM_STATE_FILE, WARM_STATE_SNAPSHOT_INTERVAL_SECONDS
+from .aliexpress_api import AliExpressApiClient
+from .product_selector import ProductSelector
+
+SNAPSHOT_VERSION = 1
+
+
+class WarmStateSnapshot:
+    """
+    حفظ الحالة الدافئة (نتائج البحث، الروابط المختصرة، إحصائيات الفئات)
+    في ملف مضغوط دورياً وعند الإيقاف، واستعادتها عند أول طلب بعد التشغيل البارد.
+    """
+
+    def __init__(
+        self,
+        selector: ProductSelector,
+        ali_client: AliExpressApiClient,
+        path: Path = WARM_STATE_FILE,
+        interval_seconds: int = WARM_STATE_SNAPSHOT_INTERVAL_SECONDS,
+    ):
+        self.selector = selector
+        self.ali_client = ali_client
+        self.path = Path(path)
+        self.interval_seconds = interval_seconds
+        self._loaded = False
+        self._load_lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def ensure_loaded(self) -> None:
+        """تحميل اللقطة مرة واحدة فقط (عند أول طلب يحتاجها)"""
+        if self._loaded:
+            return
+        with self._load_lock:
+            if self._loaded:
+                return
+            self._loaded = True
+            self.load()
+
+    def load(self) -> bool:
+        if not self.path.exists():
+            return False
+        try:
+            with gzip.open(self.path, "rt", encoding="utf-8") as f:
+                data: Dict[str, Any] = json.load(f)
+            if data.get("version") != SNAPSHOT_VERSION:
+                print("⚠️ إصدار لقطة الحالة غير متوافق، سيتم تجاهلها")
+                return False
+
+            products_loaded = self.selector.import_cache(data.get("product_cache", []))
+            self.ali_client.import_link_cache(data.get("link_cache", {}))
+            self.ali_client.credential_pool.import_state(data.get("key_usage", {}))
+            self.selector.import_category_stats(data.get("category_stats", {}))
+
+            print(f"🔥 تم تحميل لقطة الحالة: {products_loaded} نتيجة بحث مخزنة")
+            return True
+        except Exception as e:
+            print(f"❌ خطأ في تحميل لقطة الحالة: {e}")
+            return False
+
+    def save(self) -> None:
+        data = {
+            "version": SNAPSHOT_VERSION,
+            "saved_at": time.time(),
+            "product_cache": self.selector.export_cache(),
+            "link_cache": self.ali_client.export_link_cache(),
+            "key_usage": self.ali_client.credential_pool.export_state(),
+            "category_stats": self.selector.export_category_stats(),
+        }
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_name(self.path.name + ".tmp")
+        try:
+            # الكتابة في ملف مؤقت ثم الاستبدال حتى لا تتلف اللقطة عند الإيقاف المفاجئ
+            with gzip.open(tmp_path, "wt", encoding="utf-8") as f:
+                json.dump(data, f, ensure_ascii=False, separators=(",", ":"))
+            tmp_path.replace(self.path)
+        except Exception as e:
+            print(f"❌ خطأ في حفظ لقطة الحالة: {e}")
+
+    def _run(self) -> None:
+        while not self._stop_event.wait(self.interval_seconds):
+            if self._loaded:
+                self.save()
+
+    def start(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(
+            target=self._run, name="warm-state-snapshot", daemon=True
+        )
+        self._thread.start()
+        atexit.register(self.shutdown)
+
+    def shutdown(self) -> None:
+        self._stop_event.set()
+        # لا نكتب فوق لقطة سابقة قبل تحميلها، وإلا ضاعت الحالة إذا لم يصل أي طلب
+        if self._loaded:
+            self.save()
@@ -0,0 +1,14 @@
+import os
+import sys
+from pathlib import Path
+
+# قيم وهمية حتى يمكن استيراد app.config دون ملف .env
+os.environ.setdefault("TELEGRAM_BOT_TOKEN", "test-telegram-token")
+os.environ.setdefault("TELEGRAM_CHANNEL_ID", "@test_channel")
+os.environ.setdefault("AE_APP_KEY", "test-app-key")
+os.environ.setdefault("AE_APP_SECRET", "test-app-secret")
+os.environ.setdefault("ALI_TRACKING_ID", "test-tracking")
+os.environ.setdefault("REVALIDATION_ENABLED", "False")
+os.environ.setdefault("WARM_STATE_ENABLED", "False")
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
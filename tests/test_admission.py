@@ -0,0 +1,76 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from flask import Flask, jsonify
+
+from app import admission
+from app.admission import AdmissionGate, DeadlineExceeded, check_deadline, remaining_timeout
+
+
+def test_queue_is_capped_to_leave_a_thread_for_health():
+    gate = AdmissionGate(max_concurrent=2, max_queue=10, web_threads=4)
+
+    assert gate.max_concurrent == 2
+    assert gate.max_queue == 1
+
+
+def test_health_stays_fast_when_gated_routes_are_saturated():
+    app = Flask(__name__)
+    gate = AdmissionGate(max_concurrent=2, max_queue=10, queue_timeout_seconds=2, web_threads=4)
+    release = threading.Event()
+
+    @app.route("/publish")
+    @gate.limit(5)
+    def publish():
+        release.wait(2)
+        return jsonify({"status": "ok"})
+
+    @app.route("/health")
+    def health():
+        return jsonify({"status": "ok"})
+
+    client = app.test_client()
+    # مجمع من 4 خيوط يحاكي عامل gthread بأربعة خيوط
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        bursts = [pool.submit(client.get, "/publish") for _ in range(6)]
+        time.sleep(0.2)
+        started = time.monotonic()
+        health_resp = pool.submit(client.get, "/health").result(timeout=5)
+        health_latency = time.monotonic() - started
+        release.set()
+        statuses = sorted(f.result().status_code for f in bursts)
+
+    assert health_resp.status_code == 200
+    assert health_latency < 0.5
+    assert statuses.count(200) == 3
+    assert statuses.count(429) == 3
+
+
+def test_deadline_outside_gated_request_is_a_noop():
+    assert remaining_timeout(30) == 30
+    check_deadline()
+
+
+def test_route_past_its_deadline_returns_503():
+    app = Flask(__name__)
+    gate = AdmissionGate(max_concurrent=1, max_queue=0, web_threads=4)
+
+    @app.route("/slow")
+    @gate.limit(0.05)
+    def slow():
+        time.sleep(0.1)
+        check_deadline()
+        return jsonify({"status": "ok"})
+
+    assert app.test_client().get("/slow").status_code == 503
+
+
+def test_expired_deadline_raises():
+    admission._local.deadline = time.monotonic() - 1
+    try:
+        with pytest.raises(DeadlineExceeded):
+            remaining_timeout(30)
+    finally:
+        admission._local.deadline = None
@@ -0,0 +1,103 @@
+from app.aliexpress_api import AliExpressApiClient
+
+
+class FakeResponse:
+    def __init__(self, payload, status_code=200):
+        self._payload = payload
+        self.status_code = status_code
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise RuntimeError(f"HTTP {self.status_code}")
+
+    def json(self):
+        return self._payload
+
+
+def test_search_products_sends_signed_sale_price_filters(monkeypatch):
+    client = AliExpressApiClient(app_key="key", app_secret="secret", tracking_id="track")
+    captured = {}
+
+    def fake_get(url, params=None, timeout=None):
+        captured.update(params)
+        return FakeResponse({})
+
+    monkeypatch.setattr("app.aliexpress_api.requests.get", fake_get)
+
+    client.search_products({"name": "Xiaomi", "keywords": "xiaomi"}, min_price=26, max_price=58.5)
+
+    assert captured["method"] == "aliexpress.affiliate.product.query"
+    assert captured["min_sale_price"] == 2600
+    assert captured["max_sale_price"] == 5850
+    assert "min_price" not in captured and "max_price" not in captured
+    assert captured["sign"] == client._sign(captured, "secret")
+
+
+def test_get_product_details_maps_available_products(monkeypatch):
+    client = AliExpressApiClient(app_key="key", app_secret="secret", tracking_id="track")
+    payload = {
+        "aliexpress_affiliate_productdetail_get_response": {
+            "resp_result": {"result": {"products": {"product": [{
+                "product_id": 1005001,
+                "product_title": "Phone",
+                "target_sale_price": "42.5",
+                "promotion_link": "https://s.click/1005001",
+            }]}}}
+        }
+    }
+    captured = {}
+
+    def fake_get(url, params=None, timeout=None):
+        captured.update(params)
+        return FakeResponse(payload)
+
+    monkeypatch.setattr("app.aliexpress_api.requests.get", fake_get)
+
+    details = client.get_product_details(["1005001", "1005002"])
+
+    assert captured["method"] == "aliexpress.affiliate.productdetail.get"
+    assert captured["product_ids"] == "1005001,1005002"
+    assert list(details) == ["1005001"]
+    assert details["1005001"]["original_price"] == 42.5
+
+
+def test_get_product_details_returns_none_on_failure(monkeypatch):
+    client = AliExpressApiClient(app_key="key", app_secret="secret", tracking_id="track")
+    monkeypatch.setattr(
+        "app.aliexpress_api.requests.get",
+        lambda url, params=None, timeout=None: FakeResponse({}, status_code=500),
+    )
+
+    assert client.get_product_details(["1"]) is None
+
+
+def test_link_cache_is_bounded_and_drops_expired(monkeypatch):
+    monkeypatch.setattr("app.config.AFFILIATE_LINK_CACHE_MAX", 2)
+    monkeypatch.setattr("app.config.AFFILIATE_LINK_CACHE_TTL_SECONDS", 100)
+    client = AliExpressApiClient(app_key="key", app_secret="secret", tracking_id="track")
+
+    client._store_link("https://a/old", "https://s/old", created_at=0)
+    client._store_link("https://a/1", "https://s/1")
+    client._store_link("https://a/2", "https://s/2")
+    client._store_link("https://a/3", "https://s/3")
+
+    assert list(client.export_link_cache()) == ["https://a/2", "https://a/3"]
+
+
+def test_test_shorten_mode_bypasses_link_cache(monkeypatch):
+    client = AliExpressApiClient(app_key="key", app_secret="secret", tracking_id="track")
+    client._store_link("https://a/1", "https://s/cached")
+    payload = {
+        "aliexpress_affiliate_link_generate_response": {
+            "resp_result": {"result": {"promotion_links": [{"promotion_link": "https://s/live"}]}}
+        }
+    }
+    monkeypatch.setattr(
+        "app.aliexpress_api.requests.get",
+        lambda url, params=None, timeout=None: FakeResponse(payload),
+    )
+
+    assert client.generate_affiliate_link("https://a/1", use_cache=False) == "https://s/live"
+    assert client.generate_affiliate_link("https://a/9", use_cache=False) == "https://s/live"
+    assert list(client.export_link_cache()) == ["https://a/1"]
+    assert client.generate_affiliate_link("https://a/1") == "https://s/cached"
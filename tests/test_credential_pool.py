@@ -0,0 +1,38 @@
+from app.credential_pool import CredentialPool
+
+CREDENTIALS = [
+    {"app_key": "key-one", "app_secret": "s1", "tracking_id": "tracking-one"},
+    {"app_key": "key-two", "app_secret": "s2", "tracking_id": "tracking-two"},
+]
+
+
+def test_usage_masks_keys_and_tracking_ids():
+    pool = CredentialPool(CREDENTIALS, daily_quota=10)
+    pool.acquire()
+
+    for entry in pool.usage():
+        assert entry["app_key"].endswith("***")
+        assert entry["tracking_id"].endswith("***")
+        assert "tracking-one" not in entry.values()
+
+
+def test_rate_limited_key_is_cooled_down():
+    pool = CredentialPool(CREDENTIALS, daily_quota=10, cooldown_seconds=60)
+    first = pool.acquire()
+    pool.report_error(first, rate_limited=True)
+
+    assert all(pool.acquire() is not first for _ in range(5))
+
+
+def test_quota_counters_survive_export_and_import():
+    pool = CredentialPool(CREDENTIALS, daily_quota=10)
+    for _ in range(4):
+        pool.acquire()
+    state = pool.export_state()
+
+    restored = CredentialPool(CREDENTIALS, daily_quota=10)
+    restored.import_state(state)
+
+    assert restored.restored
+    assert sum(u["calls_in_window"] for u in restored.usage()) == 4
+    assert "key-one" not in str(state)
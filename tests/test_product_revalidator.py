@@ -0,0 +1,85 @@
+import time
+
+from app.coupons import CouponManager
+from app.product_revalidator import ProductRevalidator
+from app.product_selector import ProductSelector
+
+CATEGORY = {"name": "Xiaomi", "keywords": "xiaomi smartphone", "category_id": "5090801"}
+
+
+class StubAliClient:
+    """بديل محلي لـ AliExpressApiClient يعيد نتائج ثابتة دون اتصال بالشبكة"""
+
+    def __init__(self, search_results, details=None):
+        self.search_results = search_results
+        self.details = details
+        self.detail_calls = []
+
+    def search_products(self, category_info, limit=20, min_price=None, max_price=None):
+        return [dict(p) for p in self.search_results]
+
+    def get_product_details(self, product_ids):
+        self.detail_calls.append(list(product_ids))
+        if self.details is None:
+            return None
+        return {pid: self.details[pid] for pid in product_ids if pid in self.details}
+
+
+def make_product(pid, price):
+    return {
+        "id": pid,
+        "title": f"Phone {pid}",
+        "original_price": price,
+        "image_url": f"https://img/{pid}.jpg",
+        "product_url": f"https://s.click/{pid}",
+    }
+
+
+def build(details):
+    client = StubAliClient(
+        [make_product("1", 30.0), make_product("2", 40.0), make_product("3", 50.0)],
+        details,
+    )
+    selector = ProductSelector(client, CouponManager())
+    selector.get_products_for_category(CATEGORY, (26.0, 58.0))
+    revalidator = ProductRevalidator(selector, client, batch_pause_seconds=0, min_age_seconds=0)
+    return client, selector, revalidator
+
+
+def cached_products(selector):
+    return {p["id"]: p for entry in selector.export_cache() for p in entry["products"]}
+
+
+def test_revalidation_updates_prices_and_evicts_dead_items():
+    details = {
+        "1": make_product("1", 35.0),
+        # المنتج 2 لم يعد موجوداً
+        "3": make_product("3", 10.0),  # السعر الجديد خارج كل شرائح الكوبونات
+    }
+    _, selector, revalidator = build(details)
+
+    updated, evicted = revalidator.run_once()
+
+    assert (updated, evicted) == (1, 2)
+    products = cached_products(selector)
+    assert list(products) == ["1"]
+    assert products["1"]["original_price"] == 35.0
+    assert products["1"]["category"] == "Xiaomi"
+
+
+def test_failed_detail_call_keeps_cache():
+    client, selector, revalidator = build(details=None)
+
+    assert revalidator.run_once() == (0, 0)
+    assert client.detail_calls == [["1", "2", "3"]]
+    assert set(cached_products(selector)) == {"1", "2", "3"}
+
+
+def test_fresh_results_are_not_rechecked_before_min_age():
+    client, selector, _ = build(details={})
+    revalidator = ProductRevalidator(selector, client, batch_pause_seconds=0, min_age_seconds=600)
+
+    assert revalidator.run_once() == (0, 0)
+    assert client.detail_calls == []
+    assert selector.get_cached_product_ids(min_age_seconds=0) == ["1", "2", "3"]
+    assert all(p["validated_ts"] <= time.time() for p in cached_products(selector).values())
@@ -0,0 +1,67 @@
+import json
+
+from app.publish_stats import PublishStats
+from app.sent_products import SentProductsStore
+
+NOW = 1_700_000_000
+
+
+def test_windows_include_events_up_to_the_full_window():
+    stats = PublishStats()
+    stats.record_post("Xiaomi", "AFFDB4", ts=NOW - int(23.9 * 3600))
+    stats.record_post("Poco", None, ts=NOW - 59 * 60)
+    stats.record_post("Poco", None, ts=NOW - 8 * 86400)
+    stats.record_api_call(ts=NOW - 30)
+
+    summary = stats.summary(NOW)
+
+    assert summary["1h"]["posts"] == 1
+    assert summary["24h"]["posts"] == 2
+    assert summary["24h"]["by_category"] == {"Xiaomi": 1, "Poco": 1}
+    assert summary["24h"]["coupon_hit_rate"] == 0.5
+    assert summary["7d"]["posts"] == 2
+
+
+def make_store(tmp_path):
+    return SentProductsStore(
+        path=tmp_path / "sent_products.json",
+        stats_path=tmp_path / "publish_stats.json",
+    )
+
+
+def test_failures_and_api_calls_survive_restart(tmp_path):
+    store = make_store(tmp_path)
+    store.mark_sent("1", category="Xiaomi", coupon_code="AFFDB4")
+    store.record_failure()
+    store.stats.record_api_call()
+    store.stats.record_api_call(background=True)
+    store.flush()
+
+    reloaded = make_store(tmp_path).get_stats()
+
+    assert reloaded["recent_24h"] == 1
+    assert reloaded["windows"]["24h"]["failures"] == 1
+    assert reloaded["windows"]["24h"]["api_calls"] == 1
+    assert reloaded["windows"]["24h"]["background_api_calls"] == 1
+    assert reloaded["windows"]["24h"]["api_cost_per_post"] == 1.0
+
+
+def test_stats_are_kept_out_of_the_history_file(tmp_path):
+    store = make_store(tmp_path)
+    store.mark_sent("1", category="Xiaomi")
+    history_before = (tmp_path / "sent_products.json").read_text(encoding="utf-8")
+
+    store.stats.record_api_call(background=True)
+    store.flush()
+
+    assert "stats" not in json.loads(history_before)
+    assert (tmp_path / "sent_products.json").read_text(encoding="utf-8") == history_before
+
+
+def test_counters_are_saved_on_a_timer(tmp_path):
+    stats = PublishStats(tmp_path / "publish_stats.json", flush_interval_seconds=0)
+    stats.record_api_call(background=True)
+
+    reloaded = PublishStats(tmp_path / "publish_stats.json")
+    assert reloaded.load()
+    assert reloaded.window(3600)["background_api_calls"] == 1
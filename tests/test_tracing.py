@@ -0,0 +1,33 @@
+from app import tracing
+
+
+def test_profile_header_requires_configured_secret(monkeypatch):
+    monkeypatch.setattr(tracing, "PROFILE_HEADER_SECRET", "")
+    assert not tracing.profile_header_allowed("1")
+
+    monkeypatch.setattr(tracing, "PROFILE_HEADER_SECRET", "s3cret")
+    assert not tracing.profile_header_allowed("1")
+    assert not tracing.profile_header_allowed(None)
+    assert tracing.profile_header_allowed("s3cret")
+
+
+def test_profile_header_with_non_ascii_value_is_rejected(monkeypatch):
+    monkeypatch.setattr(tracing, "PROFILE_HEADER_SECRET", "abc")
+
+    assert not tracing.profile_header_allowed("café")
+
+
+def test_slow_traces_are_dumped_and_pruned(monkeypatch, tmp_path):
+    monkeypatch.setattr(tracing, "TRACES_DIR", tmp_path)
+    monkeypatch.setattr(tracing, "TRACES_MAX_FILES", 2)
+
+    for i in range(4):
+        tracing.start_trace(f"/publish/{i}")
+        with tracing.span("selector.get_random_product"):
+            pass
+        trace = tracing.finish_trace(threshold_seconds=0)
+        assert trace.spans[0]["name"] == "selector.get_random_product"
+
+    remaining = sorted(p.name for p in tmp_path.glob("trace_*.json"))
+    assert len(remaining) == 2
+    assert remaining[-1].endswith("_publish_3.json")
@@ -0,0 +1,37 @@
+from app.aliexpress_api import AliExpressApiClient
+from app.coupons import CouponManager
+from app.product_selector import ProductSelector
+from app.warm_state import WarmStateSnapshot
+
+CATEGORY = {"name": "Xiaomi", "keywords": "xiaomi smartphone", "category_id": "5090801"}
+
+
+class StubSearchClient:
+    def __init__(self, products):
+        self.products = products
+
+    def search_products(self, category_info, limit=20, min_price=None, max_price=None):
+        return [dict(p) for p in self.products]
+
+
+def make_client():
+    return AliExpressApiClient(app_key="key", app_secret="secret", tracking_id="track")
+
+
+def test_snapshot_round_trip_restores_caches(tmp_path):
+    path = tmp_path / "warm_state.json.gz"
+
+    client = make_client()
+    client._store_link("https://a/1", "https://s.click/1")
+    product = {"id": "1", "title": "Phone", "original_price": 30.0, "product_url": "https://a/1"}
+    selector = ProductSelector(StubSearchClient([product]), CouponManager())
+    selector.get_products_for_category(CATEGORY, (26.0, 58.0))
+    WarmStateSnapshot(selector, client, path=path).save()
+
+    cold_client = make_client()
+    cold_selector = ProductSelector(StubSearchClient([]), CouponManager())
+    WarmStateSnapshot(cold_selector, cold_client, path=path).ensure_loaded()
+
+    assert cold_selector.get_cached_product_ids() == ["1"]
+    assert cold_selector.export_category_stats() == {"Xiaomi": {"searches": 1, "empty": 0}}
+    assert cold_client.generate_affiliate_link("https://a/1") == "https://s.click/1"